@@ -1,16 +1,93 @@
 import os
+
+# fuera de gunicorn (que parchea solo con worker_class=gevent) hay que parchear
+# antes de importar requests/psycopg para que el I/O no bloquee el hub
+if os.getenv("USE_GEVENT") == "1":
+    from gevent import monkey
+    monkey.patch_all()
+
+import re
 import time
+import functools
+import base64
+import hashlib
+import hmac
+import threading
 import requests
 import jwt
-
-from flask import Flask, jsonify, request
+import bcrypt
+import orjson
+
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal
+from cachetools import LRUCache, TTLCache
+from flask import Flask, request
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from requests.adapters import HTTPAdapter
+from requests_toolbelt import MultipartEncoder
 from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
+from urllib3.util.retry import Retry
+from werkzeug.exceptions import BadRequest
 from werkzeug.security import generate_password_hash, check_password_hash
 
 
+_schema_ready = False
+# próximo intento de init_db (time.monotonic) mientras la DB no responde
+_schema_retry_at = 0.0
+
+# usuario autenticado (sale del JWT): se arma una vez por token y se reusa desde el cache
+User = namedtuple("User", ["id", "email"])
+
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$", re.ASCII)
+
+
+def is_valid_email(email: str) -> bool:
+    return bool(_EMAIL_RE.match(email or ""))
+
+
+def _build_requests_session() -> requests.Session:
+    # keep-alive hacia el servicio de IA: evita el handshake TCP/TLS en cada upload.
+    # Solo se reintentan errores de conexión (el POST todavía no se envió).
+    retry = Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.2)
+    adapter = HTTPAdapter(pool_connections=20, pool_maxsize=50, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+SESSION = _build_requests_session()
+
+
+def _orjson_default(obj):
+    # orjson serializa date/datetime nativamente, pero no Decimal (columnas NUMERIC)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
+
+
+def _json():
+    # body JSON sin pasar por get_json: sin chequeo de Content-Type ni cache del body
+    try:
+        return orjson.loads(request.get_data(cache=False) or b"{}")
+    except orjson.JSONDecodeError:
+        raise BadRequest("Invalid JSON body")
+
+
+class OrJSONProvider(JSONProvider):
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_orjson_default, option=orjson.OPT_NAIVE_UTC).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 def create_app():
     app = Flask(__name__)
+    app.json = OrJSONProvider(app)
 
     # =========================
     # CORS (PROD-ready)
@@ -36,8 +113,46 @@ def create_app():
     if not database_url:
         raise RuntimeError("DATABASE_URL env var is required")
 
-    database_url = database_url.replace("postgres://", "postgresql://", 1)
-    engine = create_engine(database_url, pool_pre_ping=True)
+    # driver explícito: psycopg 3 (prepared statements automáticos + pipeline en executemany)
+    for prefix in ("postgres://", "postgresql://"):
+        if database_url.startswith(prefix):
+            database_url = "postgresql+psycopg://" + database_url[len(prefix):]
+            break
+
+    # prepara server-side las queries que se repiten N veces en una conexión.
+    # Vacío lo desactiva (necesario detrás de pgbouncer en modo transaction).
+    prepare_threshold = os.getenv("DB_PREPARE_THRESHOLD", "5").strip()
+    # pool por proceso de gunicorn: dimensionarlo según la concurrencia de cada worker
+    engine = create_engine(
+        database_url,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        # sin pre-ping (un SELECT 1 extra por checkout): el recycle renueva las conexiones
+        # antes del idle timeout del server y db_retry cubre las que se cortan igual
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "900")),
+        pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", "10")),
+        pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "0") == "1",
+        connect_args={
+            "prepare_threshold": int(prepare_threshold) if prepare_threshold else None,
+            # con la DB caída, un connect no puede colgar un hilo indefinidamente
+            "connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "5")),
+        },
+    )
+    # mismo pool, pero en autocommit: los SELECT sueltos no pagan BEGIN/ROLLBACK
+    read_engine = engine.execution_options(isolation_level="AUTOCOMMIT")
+
+    def db_retry(fn):
+        # una conexión muerta se detecta al usarla: SQLAlchemy la invalida y
+        # reintentamos una vez con otra del pool. Solo para queries de lectura.
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                return fn(*args, **kwargs)
+            except DBAPIError as e:
+                if not e.connection_invalidated:
+                    raise
+                return fn(*args, **kwargs)
+        return wrapper
 
     def init_db():
         with engine.begin() as conn:
@@ -69,11 +184,59 @@ def create_app():
                 );
             """))
 
+            # /contracts?end_date= (vencimientos del notifier): igualdad + keyset por id DESC
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_contracts_end_date_id_desc
+                ON contracts (end_date, id DESC);
+            """))
+
+    # _schema_ready es por proceso: cada worker corre el DDL (idempotente) una vez;
+    # el lock solo evita que varios hilos del mismo worker lo corran a la vez
+    schema_lock = threading.Lock()
+    # con la DB caída se reintenta como mucho una vez cada N segundos, no en cada request
+    schema_retry_seconds = float(os.getenv("DB_SCHEMA_RETRY_SECONDS", "10"))
+
+    def ensure_schema() -> bool:
+        global _schema_ready, _schema_retry_at
+        if _schema_ready:
+            return True
+        if time.monotonic() < _schema_retry_at:
+            return False
+        # si otro hilo ya está intentando, no se espera detrás de su connect
+        if not schema_lock.acquire(blocking=False):
+            return False
+        try:
+            if not _schema_ready:
+                init_db()
+                _schema_ready = True
+        except Exception as e:
+            _schema_retry_at = time.monotonic() + schema_retry_seconds
+            reason = str(e).strip().splitlines()[0] if str(e).strip() else ""
+            app.logger.warning(
+                "init_db failed (%s: %s), retrying in %ss",
+                type(e).__name__, reason, schema_retry_seconds,
+            )
+        finally:
+            schema_lock.release()
+        return _schema_ready
+
+    # no tocan la DB: responden aunque Postgres esté caído (liveness)
+    SCHEMA_EXEMPT_ENDPOINTS = frozenset({"health", "root", "auth_health"})
+
+    @app.before_request
+    def _schema_guard():
+        # solo hace I/O si el DDL de arranque falló (DB caída al levantar el worker)
+        if not _schema_ready and request.endpoint not in SCHEMA_EXEMPT_ENDPOINTS:
+            ensure_schema()
+
     # =========================
     # Auth (JWT)
     # =========================
     JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret-change-me")
     JWT_TTL_SECONDS = int(os.getenv("JWT_TTL_SECONDS", "86400"))  # 24h
+    # HMAC con la clave ya cargada: cada verificación copia el estado en vez de
+    # volver a preparar la clave (PyJWT lo hace en cada decode)
+    JWT_HMAC = hmac.new(JWT_SECRET.encode(), digestmod=hashlib.sha256)
 
     def make_token(user_id: int, email: str):
         now = int(time.time())
@@ -91,30 +254,212 @@ def create_app():
             return None
         return auth.split(" ", 1)[1].strip()
 
+    # tokens ya verificados, por sha256 del token (no guardamos el token en claro).
+    # Nunca se cachean fallas de decode. JWT_CACHE_TTL=0 lo desactiva.
+    JWT_CACHE_TTL = int(os.getenv("JWT_CACHE_TTL", "10"))
+    jwt_cache = TTLCache(maxsize=10_000, ttl=JWT_CACHE_TTL) if JWT_CACHE_TTL > 0 else None
+    jwt_cache_lock = threading.Lock()
+
+    def b64url_decode(segment: str) -> bytes:
+        return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+    def decode_token(token: str):
+        # verificación HS256 propia (PyJWT queda solo para emitir): firma en tiempo
+        # constante, header con alg HS256 y claims sub/exp obligatorios. La expiración
+        # la chequea current_user. Cualquier error se traduce en 401.
+        header_b64, payload_b64, signature_b64 = token.split(".")
+        mac = JWT_HMAC.copy()
+        mac.update(f"{header_b64}.{payload_b64}".encode("ascii"))
+        if not hmac.compare_digest(mac.digest(), b64url_decode(signature_b64)):
+            raise jwt.InvalidSignatureError("Signature verification failed")
+
+        header = orjson.loads(b64url_decode(header_b64))
+        if header.get("alg") != "HS256":
+            raise jwt.InvalidAlgorithmError("The specified alg value is not allowed")
+
+        payload = orjson.loads(b64url_decode(payload_b64))
+        return User(int(payload["sub"]), payload.get("email")), int(payload["exp"])
+
     def current_user():
         token = get_bearer_token()
         if not token:
             return None
-        try:
-            payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-            return {"id": int(payload["sub"]), "email": payload.get("email")}
-        except Exception:
+
+        entry = None
+        if jwt_cache is not None:
+            key = hashlib.sha256(token.encode()).digest()
+            with jwt_cache_lock:
+                entry = jwt_cache.get(key)
+
+        if entry is None:
+            try:
+                entry = decode_token(token)
+            except Exception:
+                return None
+            if jwt_cache is not None:
+                with jwt_cache_lock:
+                    jwt_cache[key] = entry
+
+        user, exp = entry
+        # la entrada vive hasta JWT_CACHE_TTL, pero nunca más allá del exp del token
+        if exp <= time.time():
             return None
+        return user
+
+    # perfil de usuario por id para /auth/me (el dashboard lo consulta seguido).
+    # TTLCache no es thread-safe, por eso el lock.
+    USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60"))
+    user_cache = TTLCache(maxsize=10_000, ttl=USER_CACHE_TTL)
+    user_cache_lock = threading.Lock()
 
     def auth_required(fn):
+        @functools.wraps(fn)
         def wrapper(*args, **kwargs):
             u = current_user()
-            if not u:
+            if u is None:
                 return {"error": "Unauthorized"}, 401
-            request.user = u  # attach
+            request.user = u  # attach (User namedtuple)
             return fn(*args, **kwargs)
-        wrapper.__name__ = fn.__name__
         return wrapper
 
+    # =========================
+    # Passwords
+    # =========================
+    # bcrypt por defecto; cualquier otro valor se pasa como method de werkzeug
+    # (ej: "pbkdf2:sha256:600000", "scrypt"). Bajar BCRYPT_ROUNDS reduce la latencia
+    # de login/register a costa de seguridad: cada round menos divide el costo por 2.
+    PASSWORD_KDF = os.getenv("PASSWORD_KDF", "bcrypt")
+    BCRYPT_MAX_BYTES = 72
+
+    def calibrate_bcrypt_rounds(target_ms: int) -> int:
+        # menor costo cuyo hash tarda al menos target_ms en este hardware
+        rounds = 10
+        while rounds < 16:
+            t0 = time.perf_counter()
+            bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds=rounds))
+            if (time.perf_counter() - t0) * 1000 >= target_ms:
+                break
+            rounds += 1
+        return rounds
+
+    # BCRYPT_ROUNDS=auto mide al arrancar (una vez por worker) el costo para ~BCRYPT_TARGET_MS
+    bcrypt_rounds_env = os.getenv("BCRYPT_ROUNDS", "12").strip().lower()
+    if bcrypt_rounds_env == "auto":
+        BCRYPT_ROUNDS = calibrate_bcrypt_rounds(int(os.getenv("BCRYPT_TARGET_MS", "250")))
+        app.logger.info("bcrypt rounds calibrated to %s", BCRYPT_ROUNDS)
+    else:
+        BCRYPT_ROUNDS = int(bcrypt_rounds_env)
+
+    def hash_password(password: str) -> str:
+        if PASSWORD_KDF == "bcrypt":
+            return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
+        return generate_password_hash(password, method=PASSWORD_KDF)
+
+    def verify_password(stored_hash: str, password: str) -> bool:
+        if stored_hash.startswith("$2"):
+            pw = password.encode()
+            if len(pw) > BCRYPT_MAX_BYTES:
+                return False
+            return bcrypt.checkpw(pw, stored_hash.encode())
+        # hashes de werkzeug generados antes de pasar a bcrypt
+        return check_password_hash(stored_hash, password)
+
+    def needs_rehash(stored_hash: str) -> bool:
+        if PASSWORD_KDF != "bcrypt":
+            return False
+        if not stored_hash.startswith("$2"):
+            return True
+        # solo se sube el costo: con "auto" los workers pueden calibrar distinto
+        # y no queremos re-hashear en cada login alternando entre ellos
+        return int(stored_hash.split("$")[2]) < BCRYPT_ROUNDS
+
     # =========================
     # IA Service
     # =========================
     IA_EXTRACTOR_URL = os.getenv("IA_EXTRACTOR_URL", "http://127.0.0.1:8001/extract")
+    IA_TIMEOUT = int(os.getenv("IA_TIMEOUT", "60"))
+    # tope del body: werkzeug corta con 413 antes de spoolear uploads gigantes a disco/RAM
+    app.config["MAX_CONTENT_LENGTH"] = int(os.getenv("MAX_UPLOAD_MB", "20")) * 1024 * 1024
+
+    # respuestas del IA por hash del archivo: re-subir el mismo contrato no vuelve a
+    # parsearlo. Cache por proceso; IA_CACHE_SIZE=0 lo desactiva.
+    IA_CACHE_SIZE = int(os.getenv("IA_CACHE_SIZE", "256"))
+    ia_cache = LRUCache(maxsize=IA_CACHE_SIZE) if IA_CACHE_SIZE > 0 else None
+    ia_cache_lock = threading.Lock()
+
+    def file_digest(stream) -> str:
+        # hash en bloques sobre el stream del upload y rebobina para reenviarlo
+        h = hashlib.sha256()
+        for chunk in iter(lambda: stream.read(64 * 1024), b""):
+            h.update(chunk)
+        stream.seek(0)
+        return h.hexdigest()
+
+    # =========================
+    # Queries de lectura (con db_retry)
+    # =========================
+    @db_retry
+    def fetch_user_by_email(email: str):
+        with read_engine.connect() as conn:
+            return conn.execute(text("""
+                SELECT id, first_name, last_name, email, password_hash
+                FROM users
+                WHERE email = :em
+                LIMIT 1
+            """), {"em": email}).first()
+
+    @db_retry
+    def fetch_user_by_id(user_id: int):
+        with read_engine.connect() as conn:
+            return conn.execute(text("""
+                SELECT id, first_name, last_name, email
+                FROM users
+                WHERE id = :id
+            """), {"id": user_id}).first()
+
+    # una página de contratos (keyset por id DESC) armada como JSON en Postgres:
+    # {"items": [...], "nextBeforeId": <id> | null}. Flask solo reenvía los bytes.
+    CONTRACTS_PAGE_SQL = """
+        WITH page AS (
+            SELECT id, property_label, owner_name, tenant_name, start_date, end_date,
+                   amount, currency, adjustment_type
+            FROM contracts
+            {where}
+            ORDER BY id DESC
+            LIMIT :limit
+        )
+        SELECT json_build_object(
+            'items', COALESCE(json_agg(json_build_object(
+                'id', 'C-' || id::text,
+                'propertyLabel', property_label,
+                'ownerName', owner_name,
+                'tenantName', tenant_name,
+                'startDate', start_date,
+                'endDate', end_date,
+                'amount', amount::float8,
+                'currency', currency,
+                'adjustment', CASE WHEN adjustment_type = 'IPC_QUARTERLY'
+                    THEN json_build_object('type', 'IPC_QUARTERLY', 'frequencyMonths', 3)
+                    ELSE json_build_object('type', 'NONE', 'frequencyMonths', NULL)
+                END
+            ) ORDER BY id DESC), '[]'::json),
+            'nextBeforeId', CASE WHEN count(*) = :limit THEN min(id) END
+        )::text
+        FROM page
+    """
+    # una sentencia por combinación de filtros (end_date?, before_id?)
+    contracts_page_sql = {
+        (False, False): text(CONTRACTS_PAGE_SQL.format(where="")),
+        (False, True): text(CONTRACTS_PAGE_SQL.format(where="WHERE id < :before")),
+        (True, False): text(CONTRACTS_PAGE_SQL.format(where="WHERE end_date = :end_date")),
+        (True, True): text(CONTRACTS_PAGE_SQL.format(where="WHERE end_date = :end_date AND id < :before")),
+    }
+
+    @db_retry
+    def fetch_contracts_page_json(limit: int, before_id=None, end_date=None) -> str:
+        sql = contracts_page_sql[(end_date is not None, before_id is not None)]
+        with read_engine.connect() as conn:
+            return conn.execute(sql, {"limit": limit, "before": before_id, "end_date": end_date}).scalar_one()
 
     # =========================
     # Routes
@@ -134,8 +479,7 @@ def create_app():
 
     @app.post("/auth/register")
     def register():
-        init_db()
-        payload = request.get_json(force=True)
+        payload = _json()
 
         required = ["firstName", "lastName", "email", "password"]
         missing = [k for k in required if k not in payload or not str(payload[k]).strip()]
@@ -147,33 +491,38 @@ def create_app():
         email = payload["email"].strip().lower()
         password = payload["password"]
 
+        if not is_valid_email(email):
+            return {"error": "Invalid email"}, 400
+
         if len(password) < 6:
             return {"error": "Password must be at least 6 characters"}, 400
 
-        password_hash = generate_password_hash(password)
+        if PASSWORD_KDF == "bcrypt" and len(password.encode()) > BCRYPT_MAX_BYTES:
+            return {"error": f"Password must be at most {BCRYPT_MAX_BYTES} bytes"}, 400
+
+        password_hash = hash_password(password)
 
         try:
             with engine.begin() as conn:
-                res = conn.execute(text("""
+                # email duplicado: ON CONFLICT no devuelve fila (sin excepción ni rollback)
+                user_id = conn.execute(text("""
                     INSERT INTO users (first_name, last_name, email, password_hash)
                     VALUES (:fn, :ln, :em, :ph)
+                    ON CONFLICT (email) DO NOTHING
                     RETURNING id
-                """), {"fn": first_name, "ln": last_name, "em": email, "ph": password_hash})
-                user_id = res.scalar_one()
+                """), {"fn": first_name, "ln": last_name, "em": email, "ph": password_hash}).scalar()
         except Exception as e:
-            # email duplicado suele caer acá
-            msg = str(e).lower()
-            if "unique" in msg or "duplicate" in msg:
-                return {"error": "Email already registered"}, 409
             return {"error": "Register failed", "detail": str(e)}, 500
 
+        if user_id is None:
+            return {"error": "Email already registered"}, 409
+
         token = make_token(user_id, email)
         return {"token": token, "user": {"id": user_id, "firstName": first_name, "lastName": last_name, "email": email}}, 201
 
     @app.post("/auth/login")
     def login():
-        init_db()
-        payload = request.get_json(force=True)
+        payload = _json()
 
         required = ["email", "password"]
         missing = [k for k in required if k not in payload or not str(payload[k]).strip()]
@@ -183,101 +532,130 @@ def create_app():
         email = payload["email"].strip().lower()
         password = payload["password"]
 
-        with engine.begin() as conn:
-            user = conn.execute(text("""
-                SELECT id, first_name, last_name, email, password_hash
-                FROM users
-                WHERE email = :em
-                LIMIT 1
-            """), {"em": email}).mappings().first()
+        # un email mal formado no puede estar registrado: evitamos el round-trip a la DB
+        if not is_valid_email(email):
+            return {"error": "Invalid credentials"}, 401
 
-        if not user or not check_password_hash(user["password_hash"], password):
+        row = fetch_user_by_email(email)
+        if row is None:
+            return {"error": "Invalid credentials"}, 401
+        user_id, first_name, last_name, user_email, password_hash = row
+        if not verify_password(password_hash, password):
             return {"error": "Invalid credentials"}, 401
 
-        token = make_token(user["id"], user["email"])
-        return {"token": token, "user": {"id": user["id"], "firstName": user["first_name"], "lastName": user["last_name"], "email": user["email"]}}, 200
+        # rehash al loguear: migra hashes legacy (werkzeug) o de menor costo al KDF actual.
+        # Es best-effort: si falla, el login sigue siendo válido.
+        if needs_rehash(password_hash) and len(password.encode()) <= BCRYPT_MAX_BYTES:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text("""
+                        UPDATE users SET password_hash = :ph WHERE id = :id
+                    """), {"ph": hash_password(password), "id": user_id})
+            except Exception:
+                app.logger.warning("password rehash failed for user %s", user_id, exc_info=True)
+
+        token = make_token(user_id, user_email)
+        return {"token": token, "user": {"id": user_id, "firstName": first_name, "lastName": last_name, "email": user_email}}, 200
 
     @app.get("/auth/me")
     @auth_required
     def me():
         u = request.user
-        with engine.begin() as conn:
-            user = conn.execute(text("""
-                SELECT id, first_name, last_name, email
-                FROM users
-                WHERE id = :id
-            """), {"id": u["id"]}).mappings().first()
+        with user_cache_lock:
+            cached = user_cache.get(u.id)
+        if cached is not None:
+            return {"user": cached}, 200
 
-        if not user:
+        row = fetch_user_by_id(u.id)
+        if row is None:
             return {"error": "User not found"}, 404
 
-        return {"user": {"id": user["id"], "firstName": user["first_name"], "lastName": user["last_name"], "email": user["email"]}}, 200
+        user_id, first_name, last_name, email = row
+        data = {"id": user_id, "firstName": first_name, "lastName": last_name, "email": email}
+        with user_cache_lock:
+            user_cache[u.id] = data
+        return {"user": data}, 200
 
     # ---------- CONTRACTS ----------
+    CONTRACTS_PAGE_DEFAULT = 50
+    CONTRACTS_PAGE_MAX = 200
+
     @app.get("/contracts")
     def list_contracts():
-        init_db()
-        with engine.begin() as conn:
-            rows = conn.execute(text("""
-                SELECT id, property_label, owner_name, tenant_name, start_date, end_date,
-                       amount, currency, adjustment_type
-                FROM contracts
-                ORDER BY id DESC
-            """)).mappings().all()
-
-        data = []
-        for r in rows:
-            data.append({
-                "id": f"C-{r['id']}",
-                "propertyLabel": r["property_label"],
-                "ownerName": r["owner_name"],
-                "tenantName": r["tenant_name"],
-                "startDate": r["start_date"].isoformat(),
-                "endDate": r["end_date"].isoformat(),
-                "amount": float(r["amount"]),
-                "currency": r["currency"],
-                "adjustment": {
-                    "type": "IPC_QUARTERLY" if r["adjustment_type"] == "IPC_QUARTERLY" else "NONE",
-                    "frequencyMonths": 3 if r["adjustment_type"] == "IPC_QUARTERLY" else None
-                }
-            })
-
-        return jsonify(data)
+        # ?limit=&before_id= (before_id acepta "123" o "C-123", el nextBeforeId de la página anterior)
+        # ?end_date=YYYY-MM-DD filtra por vencimiento exacto (lo usa el notifier)
+        try:
+            limit = int(request.args.get("limit", CONTRACTS_PAGE_DEFAULT))
+            before_raw = request.args.get("before_id", "").strip()
+            before_id = int(before_raw.removeprefix("C-")) if before_raw else None
+        except ValueError:
+            return {"error": "limit and before_id must be integers"}, 400
+        limit = max(1, min(limit, CONTRACTS_PAGE_MAX))
+
+        end_raw = request.args.get("end_date", "").strip()
+        try:
+            end_date = date.fromisoformat(end_raw) if end_raw else None
+        except ValueError:
+            return {"error": "end_date must be YYYY-MM-DD"}, 400
+
+        body = fetch_contracts_page_json(limit, before_id, end_date)
+        return app.response_class(body, mimetype="application/json")
+
+    CONTRACT_REQUIRED = ["propertyLabel", "ownerName", "tenantName", "startDate", "endDate", "amount", "currency"]
+    INSERT_CONTRACT_SQL = """
+        INSERT INTO contracts (property_label, owner_name, tenant_name, start_date, end_date, amount, currency, adjustment_type)
+        VALUES (:property_label, :owner_name, :tenant_name, :start_date, :end_date, :amount, :currency, :adjustment_type)
+    """
+
+    def contract_params(payload):
+        adjustment_type = "IPC_QUARTERLY" if payload.get("currency") == "ARS" else "NONE"
+        return {
+            "property_label": payload["propertyLabel"],
+            "owner_name": payload["ownerName"],
+            "tenant_name": payload["tenantName"],
+            "start_date": payload["startDate"],
+            "end_date": payload["endDate"],
+            "amount": payload["amount"],
+            "currency": payload["currency"],
+            "adjustment_type": adjustment_type
+        }
 
     @app.post("/contracts")
     def create_contract():
-        init_db()
-        payload = request.get_json(force=True)
+        payload = _json()
 
-        required = ["propertyLabel", "ownerName", "tenantName", "startDate", "endDate", "amount", "currency"]
-        missing = [k for k in required if k not in payload]
+        missing = [k for k in CONTRACT_REQUIRED if k not in payload]
         if missing:
             return {"error": f"Missing fields: {', '.join(missing)}"}, 400
 
-        adjustment_type = "IPC_QUARTERLY" if payload.get("currency") == "ARS" else "NONE"
-
         with engine.begin() as conn:
-            res = conn.execute(text("""
-                INSERT INTO contracts (property_label, owner_name, tenant_name, start_date, end_date, amount, currency, adjustment_type)
-                VALUES (:property_label, :owner_name, :tenant_name, :start_date, :end_date, :amount, :currency, :adjustment_type)
-                RETURNING id
-            """), {
-                "property_label": payload["propertyLabel"],
-                "owner_name": payload["ownerName"],
-                "tenant_name": payload["tenantName"],
-                "start_date": payload["startDate"],
-                "end_date": payload["endDate"],
-                "amount": payload["amount"],
-                "currency": payload["currency"],
-                "adjustment_type": adjustment_type
-            })
+            res = conn.execute(text(INSERT_CONTRACT_SQL + " RETURNING id"), contract_params(payload))
             new_id = res.scalar_one()
 
         return {"id": f"C-{new_id}"}, 201
 
+    @app.post("/contracts/bulk")
+    def create_contracts_bulk():
+        payload = _json()
+        if not isinstance(payload, list) or not payload:
+            return {"error": "Expected a non-empty JSON array of contracts"}, 400
+
+        for i, item in enumerate(payload):
+            if not isinstance(item, dict):
+                return {"error": f"Item {i}: expected an object"}, 400
+            missing = [k for k in CONTRACT_REQUIRED if k not in item]
+            if missing:
+                return {"error": f"Item {i}: missing fields: {', '.join(missing)}"}, 400
+
+        # una sola llamada executemany: psycopg 3 la despacha en pipeline mode,
+        # sin esperar el round-trip de cada contrato
+        with engine.begin() as conn:
+            conn.execute(text(INSERT_CONTRACT_SQL), [contract_params(item) for item in payload])
+
+        return {"created": len(payload)}, 201
+
     @app.post("/contracts/upload")
     def upload_contract():
-        init_db()
 
         if "file" not in request.files:
             return {"error": "file is required (multipart/form-data)"}, 400
@@ -290,14 +668,38 @@ def create_app():
         if not (filename.endswith(".pdf") or filename.endswith(".docx")):
             return {"error": "Only .pdf or .docx supported"}, 400
 
-        files = {"file": (f.filename, f.read(), "application/octet-stream")}
+        # la extensión entra en la key: el IA parsea distinto .pdf y .docx
+        cache_key = None
+        if ia_cache is not None:
+            cache_key = (file_digest(f.stream), filename.rsplit(".", 1)[-1])
+            with ia_cache_lock:
+                cached = ia_cache.get(cache_key)
+            if cached is not None:
+                return app.response_class(cached, status=200, mimetype="application/json")
+
+        # se reenvía el stream del upload tal cual, sin cargar el archivo entero en memoria
+        encoder = MultipartEncoder(fields={"file": (f.filename, f.stream, "application/octet-stream")})
         try:
-            r = requests.post(IA_EXTRACTOR_URL, files=files, timeout=60)
+            r = SESSION.post(
+                IA_EXTRACTOR_URL,
+                data=encoder,
+                headers={"Content-Type": encoder.content_type},
+                timeout=IA_TIMEOUT,
+            )
             r.raise_for_status()
         except requests.RequestException as e:
             return {"error": "IA service unavailable", "detail": str(e)}, 502
 
-        return r.json(), 200
+        if cache_key is not None:
+            with ia_cache_lock:
+                ia_cache[cache_key] = r.content
+
+        # el IA ya responde JSON (orjson): se reenvía el body sin parsearlo ni re-serializarlo
+        return app.response_class(r.content, status=200, mimetype="application/json")
+
+    # el schema se crea una sola vez al levantar la app, no en cada request;
+    # si la DB no está disponible el worker arranca igual
+    ensure_schema()
 
     return app
 
@@ -1,3 +1,17 @@
+import os
+
 bind = "0.0.0.0:10000"
-workers = 2
-timeout = 120
\ No newline at end of file
+# cada worker tiene su propio pool de DB (DB_POOL_SIZE + DB_MAX_OVERFLOW): escalar con cuidado
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+# gthread: hilos por worker. No todo es I/O: login y registro corren bcrypt (cost 12,
+# ~250 ms de CPU) y con gevent ese cálculo corre en el hub y frena todas las greenlets
+# del worker (health checks y rutas que solo esperan a Postgres) mientras dura.
+# Con hilos el resto de los requests sigue atendiéndose (bcrypt suelta el GIL).
+# GUNICORN_WORKER_CLASS=gevent queda como opción, con ese costo en cada login.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+# conexiones por worker: solo aplica con gevent
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+# hilos por worker: solo aplica con gthread
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+timeout = 120
+keepalive = 5
\ No newline at end of file
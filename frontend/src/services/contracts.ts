@@ -1,11 +1,30 @@
 import { api } from "./api";
 import type { Contract } from "../types/contract";
 
-export async function getContracts(): Promise<Contract[]> {
-  const res = await api.get<Contract[]>("/contracts");
+export type ContractsPage = {
+  items: Contract[];
+  nextBeforeId: number | null;
+};
+
+export async function getContractsPage(beforeId?: number | null, limit = 200): Promise<ContractsPage> {
+  const params: Record<string, number> = { limit };
+  if (beforeId != null) params.before_id = beforeId;
+  const res = await api.get<ContractsPage>("/contracts", { params });
   return res.data;
 }
 
+// recorre todas las páginas (los filtros de la tabla son client-side)
+export async function getContracts(): Promise<Contract[]> {
+  const all: Contract[] = [];
+  let beforeId: number | null = null;
+  do {
+    const page: ContractsPage = await getContractsPage(beforeId);
+    all.push(...page.items);
+    beforeId = page.nextBeforeId;
+  } while (beforeId != null);
+  return all;
+}
+
 export type CreateContractPayload = {
   propertyLabel: string;
   ownerName: string;
@@ -1,13 +1,45 @@
 import re
 import io
+import os
 import calendar
+import hashlib
+import threading
+import zipfile
+from collections import OrderedDict
+from contextlib import asynccontextmanager, closing
 from datetime import date, datetime
-from typing import Optional, Tuple, List, Dict, Any
+from itertools import islice
+from typing import Optional, Tuple, List, Dict, Any, Iterable, Iterator, BinaryIO, Union
 
-from fastapi import FastAPI, File, UploadFile
+from anyio.to_thread import current_default_thread_limiter
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+from fastapi.responses import ORJSONResponse
 from docx import Document
+from docx.oxml.ns import nsmap, qn
+from lxml import etree
+import pypdfium2 as pdfium
+from pypdf import PasswordType, PdfReader
 
-app = FastAPI()
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+# /extract es un endpoint sync (parseo + regex, CPU/bloqueante) y corre en el
+# threadpool de anyio; el default de 40 hilos se ajusta por env. La lectura de
+# PDFs con pdfium igual se serializa entre hilos (ver _PDFIUM_LOCK)
+EXTRACT_THREADS = int(os.getenv("IA_EXTRACT_THREADS", "32"))
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    current_default_thread_limiter().total_tokens = EXTRACT_THREADS
+    warm_up()
+    yield
+
+
+# orjson para serializar las respuestas (textPreview puede ser largo)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 MONTHS = {
     "enero": "01",
@@ -27,9 +59,8 @@ MONTHS = {
 
 
 def normalize(s: str) -> str:
-    s = s.replace("\u00a0", " ")
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    # split() sin argumentos corta por cualquier espacio unicode (incluye \xa0), igual que \s+
+    return " ".join(s.split())
 
 
 def _iso_to_date(iso: str) -> date:
@@ -43,18 +74,157 @@ def _add_months(d: date, months: int) -> date:
     return date(y, m, min(d.day, last_day))
 
 
-def extract_text_from_docx(content: bytes) -> str:
-    doc = Document(io.BytesIO(content))
-    parts = [p.text for p in doc.paragraphs if p.text and p.text.strip()]
+# los parsers aceptan bytes o un stream binario (el SpooledTemporaryFile del
+# upload), para no copiar el archivo entero a memoria antes de parsearlo
+Source = Union[bytes, BinaryIO]
+
+
+def _as_stream(content: Source) -> BinaryIO:
+    return io.BytesIO(content) if isinstance(content, bytes) else content
+
+
+# tope de páginas a leer de un PDF: lo útil (partes, objeto, plazo, precio) está al principio
+PDF_MAX_PAGES = int(os.getenv("IA_PDF_MAX_PAGES", "40"))
+# pdfium (C++) por defecto; IA_PDF_BACKEND=pypdf vuelve al extractor en Python puro
+PDF_BACKEND = os.getenv("IA_PDF_BACKEND", "pdfium").strip().lower()
+# mismo criterio que PDF_MAX_PAGES para DOCX/texto, que no tienen páginas (~50 páginas)
+TEXT_MAX_CHARS = int(os.getenv("IA_TEXT_MAX_CHARS", "200000"))
+
+
+# Paragraph.text de python-docx arma wrappers y corre un xpath por párrafo y por run;
+# acá se toma el contenido de los runs (también dentro de hipervínculos) con un solo
+# XPath compilado y se traduce igual que python-docx: tab/ptab -> "\t", cr y br de
+# salto de línea -> "\n", br de página/columna -> "", noBreakHyphen -> "-"
+_DOCX_RUN_CONTENT = etree.XPath(
+    "(w:r | w:hyperlink/w:r)/*[self::w:t or self::w:tab or self::w:ptab"
+    " or self::w:br or self::w:cr or self::w:noBreakHyphen]",
+    namespaces={"w": nsmap["w"]},
+)
+_W_P = qn("w:p")
+_W_T = qn("w:t")
+_W_BR = qn("w:br")
+_W_BR_TYPE = qn("w:type")
+_DOCX_RUN_SYMBOLS = {qn("w:tab"): "\t", qn("w:ptab"): "\t", qn("w:cr"): "\n", qn("w:noBreakHyphen"): "-"}
+
+
+def _docx_paragraph_text(p) -> str:
+    out = []
+    for e in _DOCX_RUN_CONTENT(p):
+        tag = e.tag
+        if tag == _W_T:
+            out.append(e.text or "")
+        elif tag == _W_BR:
+            if e.get(_W_BR_TYPE, "textWrapping") == "textWrapping":
+                out.append("\n")
+        else:
+            out.append(_DOCX_RUN_SYMBOLS[tag])
+    return "".join(out)
+
+
+def extract_text_from_docx(content: Source) -> str:
+    # un .docx roto no puede tirar un 500: sin texto, los campos salen vacíos.
+    # BadZipFile: no es un zip; KeyError: falta una parte; ValueError: no es Word
+    try:
+        doc = Document(_as_stream(content))
+    except (zipfile.BadZipFile, KeyError, ValueError, etree.XMLSyntaxError):
+        return ""
+    parts = []
+    size = 0
+    # mismos párrafos que doc.paragraphs: los w:p directos del body
+    for p in doc.element.body.iterchildren(_W_P):
+        text = _docx_paragraph_text(p)
+        if text and not text.isspace():
+            parts.append(text)
+            size += len(text) + 1
+            if size >= TEXT_MAX_CHARS:
+                break
     return "\n".join(parts)
 
 
-def extract_text_from_file(content: bytes, filename: str) -> str:
-    name = (filename or "").lower()
-    if name.endswith(".docx"):
+# PDFium no es thread-safe y pypdfium2 no serializa las llamadas: /extract corre en
+# el threadpool, así que toda llamada a pdfium (abrir, cargar página, extraer texto,
+# cerrar) se hace con este lock tomado. Se suelta entre páginas, nunca durante un yield.
+# RLock: si el GC cierra un generador abandonado en un hilo que ya tiene el lock
+_PDFIUM_LOCK = threading.RLock()
+
+
+def _iter_pdf_pages_pdfium(content: Source) -> Iterator[str]:
+    try:
+        with _PDFIUM_LOCK:
+            pdf = pdfium.PdfDocument(content)
+            n_pages = min(len(pdf), PDF_MAX_PAGES)
+    except pdfium.PdfiumError:
+        # protegido con contraseña, truncado o no es un PDF: no hay texto que leer y
+        # los campos quedan vacíos para completarlos a mano (no un 500)
+        return
+    try:
+        for i in range(n_pages):
+            try:
+                with _PDFIUM_LOCK:
+                    page = pdf[i]
+                    try:
+                        textpage = page.get_textpage()
+                        try:
+                            text = textpage.get_text_range()
+                        finally:
+                            textpage.close()
+                    finally:
+                        page.close()
+            except pdfium.PdfiumError:
+                # página dañada: se extrae con lo leído hasta acá
+                return
+            # pdfium separa líneas con \r\n
+            yield text.replace("\r\n", "\n")
+    finally:
+        with _PDFIUM_LOCK:
+            pdf.close()
+
+
+def _iter_pdf_pages_pypdf(content: Source) -> Iterator[str]:
+    # pypdf es Python puro y un archivo roto puede fallar con cualquier excepción
+    # (PdfReadError, PdfStreamError, KeyError...): mismo criterio que con pdfium
+    try:
+        reader = PdfReader(_as_stream(content), strict=False)
+        # pypdf ya probó la contraseña vacía; si no alcanzó, cortar antes de tocar páginas
+        if reader.is_encrypted and reader.decrypt("") == PasswordType.NOT_DECRYPTED:
+            return
+        n_pages = min(len(reader.pages), PDF_MAX_PAGES)
+    except Exception:
+        return
+    # reader.pages es perezoso: solo se parsean las páginas que se piden
+    for i in range(n_pages):
+        try:
+            text = reader.pages[i].extract_text() or ""
+        except Exception:
+            return
+        yield text
+
+
+def iter_pdf_pages(content: Source) -> Iterator[str]:
+    # página por página, para poder cortar antes de decodificar todo el documento
+    if PDF_BACKEND == "pypdf":
+        return _iter_pdf_pages_pypdf(content)
+    return _iter_pdf_pages_pdfium(content)
+
+
+_FILE_KINDS = {"pdf": "pdf", "docx": "docx"}
+
+
+def file_kind(filename: Optional[str]) -> str:
+    # pdf | docx | text (cualquier otra extensión se decodifica como texto plano)
+    _, dot, ext = (filename or "").rpartition(".")
+    return _FILE_KINDS.get(ext.lower(), "text") if dot else "text"
+
+
+def extract_text_from_file(content: Source, kind: str) -> str:
+    # kind viene de file_kind(): el endpoint ya lo resolvió para la cache key
+    if kind == "docx":
         return extract_text_from_docx(content)
+    if not isinstance(content, bytes):
+        # utf-8: a lo sumo 4 bytes por carácter
+        content = content.read(TEXT_MAX_CHARS * 4)
     try:
-        return content.decode("utf-8", errors="ignore")
+        return content.decode("utf-8", errors="ignore")[:TEXT_MAX_CHARS]
     except Exception:
         return ""
 
@@ -63,25 +233,159 @@ def extract_text_from_file(content: bytes, filename: str) -> str:
 # Extraction (robusta)
 # =========================
 
+# Los patrones se compilan una sola vez al importar el módulo, no en cada documento
+
+# RE2 (autómata, tiempo lineal) para los patrones que recorren todo el documento:
+# con `re` los .+?/.{0,n}? encadenados hacen backtracking en textos largos sin match.
+# Los que corren sobre fragmentos cortos o dependen de \b unicode (nombres que
+# empiezan con Á, Ñ...) quedan en `re`. IA_REGEX_ENGINE=re fuerza el motor estándar.
+REGEX_ENGINE = os.getenv("IA_REGEX_ENGINE", "re2").strip().lower()
+
+# \s de Python (str) incluye espacios unicode (ej. \xa0 de los .docx); el de RE2 es solo ASCII
+_RE2_SPACE = r"\s\x{b}\x{1c}-\x{1f}\x{85}\x{a0}\x{1680}\x{2000}-\x{200a}\x{2028}\x{2029}\x{202f}\x{205f}\x{3000}"
+
+
+# letras ASCII que con IGNORECASE no pliegan a una no ASCII (i/ı, s/ſ, k/K)
+_RE2_BOUNDARY_LETTERS = frozenset("abcdefghjlmnopqrtuvwxyzABCDEFGHJLMNOPQRTUVWXYZ")
+
+
+def _re2_boundary_is_safe(pattern: str, i: int) -> bool:
+    # el \b en pattern[i] está pegado a una letra ASCII literal del patrón: del otro
+    # lado, RE2 ve borde en todo lo que `re` ve como borde (y además junto a á, ñ...)
+    prev_letter = i >= 1 and pattern[i - 1] in _RE2_BOUNDARY_LETTERS and pattern[i - 2 : i - 1] != "\\"
+    next_letter = i + 2 < len(pattern) and pattern[i + 2] in _RE2_BOUNDARY_LETTERS
+    return prev_letter or next_letter
+
+
+def _to_re2(pattern: str, flags: int) -> str:
+    out = []
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            nxt = pattern[i + 1]
+            if nxt == "s":
+                out.append(_RE2_SPACE if in_class else f"[{_RE2_SPACE}]")
+            elif nxt == "d":
+                # \d de Python (str) son todos los dígitos unicode; el de RE2, solo 0-9
+                out.append(r"\p{Nd}")
+            elif nxt == "b" and not _re2_boundary_is_safe(pattern, i):
+                # junto a un grupo, una clase, un dígito o i/s/k no hay garantía:
+                # RE2 lo omite y lo comprueba `re` (ver _Re2WordBoundaries)
+                pass
+            else:
+                out.append(c + nxt)
+            i += 2
+            continue
+        if c == "[":
+            in_class = True
+        elif c == "]":
+            in_class = False
+        out.append(c)
+        i += 1
+    inline = ("i" if flags & re.IGNORECASE else "") + ("s" if flags & re.DOTALL else "")
+    return (f"(?{inline})" if inline else "") + "".join(out)
+
+
+def _re2_options():
+    # presupuesto de memoria por patrón para los autómatas cacheados (default 8 MB):
+    # con los .{0,1000}? se llena con un par de documentos grandes y se descarta
+    # todo lo ya construido, que el próximo documento vuelve a pagar
+    options = re2.Options()
+    options.max_mem = 32 << 20
+    return options
+
+
+class _Re2WordBoundaries:
+    """
+    RE2 con los \b de `re`. El \b de RE2 es solo ASCII: á, ñ... no cuentan como
+    letras, así que "estáentre" tiene un borde antes de "entre". _to_re2 deja en
+    RE2 solo los \b pegados a una letra ASCII del patrón y omite el resto, así que
+    RE2 acepta un superconjunto de lo que acepta `re`. RE2 encuentra el candidato
+    y `re` lo confirma anclado en ese inicio (acotado: un solo inicio, no todo el
+    texto); el primero que confirma es el match de `re`, con los mismos grupos.
+    """
+
+    def __init__(self, fast, exact: "re.Pattern[str]"):
+        self._fast = fast
+        self._exact = exact
+
+    def _matches(self, text: str, pos: int) -> Iterator["re.Match[str]"]:
+        # RE2 sobre los bytes UTF-8, codificados una sola vez: con str el wrapper
+        # re-codifica el texto entero en cada search, y cada candidato descartado
+        # costaría O(N). Los offsets de bytes se pasan a caracteres de a tramos.
+        data = text.encode("utf-8")
+        byte_pos = len(text[:pos].encode("utf-8"))
+        while pos <= len(text):
+            m = self._fast.search(data, byte_pos)
+            if m is None:
+                return
+            pos += len(data[byte_pos : m.start()].decode("utf-8"))
+            byte_pos = m.start()
+            exact = self._exact.match(text, pos)
+            if exact is not None:
+                yield exact
+            # sin match, el próximo candidato puede empezar en el carácter siguiente
+            step = max(exact.end() - pos, 1) if exact is not None else 1
+            byte_pos += len(text[pos : pos + step].encode("utf-8"))
+            pos += step
+
+    def search(self, text: str, pos: int = 0) -> Optional["re.Match[str]"]:
+        return next(self._matches(text, pos), None)
+
+    def finditer(self, text: str) -> Iterator["re.Match[str]"]:
+        return self._matches(text, 0)
+
+
+def _compile_linear(pattern: str, flags: int = 0):
+    if re2 is not None and REGEX_ENGINE == "re2":
+        try:
+            fast = re2.compile(_to_re2(pattern, flags), _re2_options())
+        except re2.error:
+            pass
+        else:
+            if r"\b" in pattern:
+                return _Re2WordBoundaries(fast, re.compile(pattern, flags))
+            return fast
+    return re.compile(pattern, flags)
+
+
+_NAME_PREFIX_RE = re.compile(r"^\s*(el|la)\s+(señor|señora|sr\.?|sra\.?)\s*:?\s*", re.IGNORECASE)
+_NAME_ID_SPLIT_RE = re.compile(r"\b(DNI|CUIT|CDI|LC|LE)\b", re.IGNORECASE)
+_NAME_BAD_CHARS_RE = re.compile(r"[@/]")
+_NAME_CON_DNI_RE = re.compile(r"\b([A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ\s'.-]{2,80})\s+con\s+DNI\b")
+
+
 def _clean_name(raw: str) -> Optional[str]:
     raw = normalize(raw)
 
     # sacar prefijos típicos
-    raw = re.sub(r"^\s*(el|la)\s+(señor|señora|sr\.?|sra\.?)\s*:?\s*", "", raw, flags=re.IGNORECASE)
+    raw = _NAME_PREFIX_RE.sub("", raw)
 
     raw = raw.replace("“", "").replace("”", "").replace('"', "").strip(" ,;-")
     # cortar basura típica
-    raw = re.split(r"\b(DNI|CUIT|CDI|LC|LE)\b", raw, flags=re.IGNORECASE)[0]
+    raw = _NAME_ID_SPLIT_RE.split(raw)[0]
     raw = normalize(raw).strip(" ,;-")
 
     if len(raw) < 3:
         return None
-    if re.search(r"[@/]", raw):
+    if _NAME_BAD_CHARS_RE.search(raw):
         return None
 
     return raw
 
 
+def _labeled_party_re(label: str):
+    return _compile_linear(
+        rf"(?:^|[\s,;\n])(?P<block>.{{0,700}}?)\ben\s+adelante\s+denominad[oa]\s+\"?{label}\"?",
+        re.IGNORECASE | re.DOTALL,
+    )
+
+
+_LABELED_PARTY_RES = {label: _labeled_party_re(label) for label in ("EL LOCADOR", "EL LOCATARIO")}
+
+
 def _extract_labeled_party(text: str, label: str) -> Optional[str]:
     """
     Busca el nombre que aparece antes de 'en adelante denominado "EL LOCADOR/LOCATARIO"'
@@ -89,66 +393,71 @@ def _extract_labeled_party(text: str, label: str) -> Optional[str]:
     """
     t = text
 
-    m = re.search(
-        rf"(?:^|[\s,;\n])(?P<block>.{{0,700}}?)\ben\s+adelante\s+denominad[oa]\s+\"?{label}\"?",
-        t,
-        re.IGNORECASE | re.DOTALL,
-    )
+    pattern = _LABELED_PARTY_RES.get(label) or _labeled_party_re(label)
+    m = pattern.search(t)
     if not m:
         return None
 
     block = m.group("block")
 
-    hits = re.findall(r"\b([A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ\s'.-]{2,80})\s+con\s+DNI\b", block)
+    hits = _NAME_CON_DNI_RE.findall(block)
     if not hits:
         return None
 
     return _clean_name(hits[-1])
 
 
-def detect_parties(text: str) -> Tuple[Optional[str], Optional[str]]:
+_PARTIES_NACIONALIDAD_RE = _compile_linear(
+    r"\bentre\s+(?P<owner>.{1,200}?)\s+con\s+DNI\b.{1,1000}?\bpor\s+una\s+parte\b\s*,?\s*y\s+por\s+la\s+otra\s+(?P<tenant>.{1,200}?)\s*,\s+de\s+nacionalidad\b",
+    re.IGNORECASE | re.DOTALL
+)
+_PARTIES_CON_DNI_RE = _compile_linear(
+    r"\bentre\s+(?P<owner>.{1,200}?)\s+con\s+DNI\b.{1,1000}?\bpor\s+una\s+parte\b.{1,300}?\by\s+por\s+la\s+otra\b(?:\s+el\s+señor\s*:)?\s*(?P<tenant>.{1,200}?)\s*,\s+con\s+DNI\b",
+    re.IGNORECASE | re.DOTALL
+)
+_PARTIES_SIGNATURES_RE = _compile_linear(
+    r"\n\s*(?P<tenant>[A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ\s'.-]{3,80})\s+.{0,200}?\"?EL\s+LOCATARIO\"?.{0,200}\s*(?P<owner>[A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ\s'.-]{3,80})\s+.{0,200}?\"?EL\s+LOCADOR\"?",
+    re.IGNORECASE | re.DOTALL
+)
+_PARTIES_POR_LA_OTRA_RE = _compile_linear(
+    r"\by\s+por\s+la\s+otra\b(?:\s+el\s+señor\s*:)?\s*(?P<tenant>.{1,200}?)\s*,\s+con\s+DNI\b",
+    re.IGNORECASE | re.DOTALL
+)
+
+
+def _detect_parties(text: str) -> Tuple[Optional[str], Optional[str], bool]:
     """
     Estrategia (robusta para contratos mal rotulados):
     1) Patrón fuerte "entre X ... por una parte, y por la otra Y ..." (NO depende de LOCADOR/LOCATARIO)
     2) Fallback por firmas: 'X "EL LOCATARIO" ... Y "EL LOCADOR"'
     3) Si hay rótulos (LOCADOR/LOCATARIO), extraer por rótulo
     4) Fallback: dos primeras apariciones "X con DNI"
+    El bool indica si salió del patrón 1: más texto al final no lo cambia
+    (ver extract_fields_incremental); cualquier otro se puede reemplazar.
     """
     t = text
 
     # 1) Patrón principal con "de nacionalidad"
-    m = re.search(
-        r"\bentre\s+(?P<owner>.+?)\s+con\s+DNI\b.+?\bpor\s+una\s+parte\b\s*,?\s*y\s+por\s+la\s+otra\s+(?P<tenant>.+?)\s*,\s+de\s+nacionalidad\b",
-        t,
-        re.IGNORECASE | re.DOTALL
-    )
+    m = _PARTIES_NACIONALIDAD_RE.search(t)
     if m:
         owner = _clean_name(m.group("owner"))
         tenant = _clean_name(m.group("tenant"))
-        return owner, tenant
+        return owner, tenant, True
 
     # 1b) Variante sin "de nacionalidad" pero con "con DNI"
-    m = re.search(
-        r"\bentre\s+(?P<owner>.+?)\s+con\s+DNI\b.+?\bpor\s+una\s+parte\b.+?\by\s+por\s+la\s+otra\b(?:\s+el\s+señor\s*:)?\s*(?P<tenant>.+?)\s*,\s+con\s+DNI\b",
-        t,
-        re.IGNORECASE | re.DOTALL
-    )
+    m = _PARTIES_CON_DNI_RE.search(t)
     if m:
         owner = _clean_name(m.group("owner"))
         tenant = _clean_name(m.group("tenant"))
-        return owner, tenant
+        return owner, tenant, False
 
     # 2) Fallback por firmas (muy confiable cuando el texto está mal rotulado)
-    m = re.search(
-        r"\n\s*(?P<tenant>[A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ\s'.-]{3,80})\s+.*?\"?EL\s+LOCATARIO\"?.{0,200}\s*(?P<owner>[A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ\s'.-]{3,80})\s+.*?\"?EL\s+LOCADOR\"?",
-        t,
-        re.IGNORECASE | re.DOTALL
-    )
+    m = _PARTIES_SIGNATURES_RE.search(t)
     if m:
         tenant = _clean_name(m.group("tenant"))
         owner = _clean_name(m.group("owner"))
         if owner or tenant:
-            return owner, tenant
+            return owner, tenant, False
 
     # 3) Intentar por rótulos (puede fallar si el contrato está mal redactado)
     owner = _extract_labeled_party(t, "EL LOCADOR")
@@ -156,77 +465,98 @@ def detect_parties(text: str) -> Tuple[Optional[str], Optional[str]]:
 
     # Rescate adicional del "por la otra" si no hay tenant por rótulo
     if tenant is None:
-        m = re.search(
-            r"\by\s+por\s+la\s+otra\b(?:\s+el\s+señor\s*:)?\s*(?P<tenant>.+?)\s*,\s+con\s+DNI\b",
-            t,
-            re.IGNORECASE | re.DOTALL
-        )
+        m = _PARTIES_POR_LA_OTRA_RE.search(t)
         if m:
             tenant = _clean_name(m.group("tenant"))
 
     if owner or tenant:
-        return owner, tenant
+        return owner, tenant, False
 
     # 4) Fallback: dos primeras apariciones "X con DNI"
-    hits = re.findall(r"\b([A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ\s'.-]{2,80})\s+con\s+DNI\b", t)
-    if len(hits) >= 2:
-        return _clean_name(hits[0]), _clean_name(hits[1])
+    # el patrón (re, con backtracking) exige "DNI" literal: sin esa palabra no se
+    # corre sobre el documento, y si está se corta en la segunda aparición
+    if "DNI" in t:
+        hits = [m.group(1) for m in islice(_NAME_CON_DNI_RE.finditer(t), 2)]
+        if len(hits) == 2:
+            return _clean_name(hits[0]), _clean_name(hits[1]), False
 
-    return None, None
+    return None, None, False
 
 
-def detect_property_label(text: str) -> Optional[str]:
+def detect_parties(text: str) -> Tuple[Optional[str], Optional[str]]:
+    owner, tenant, _ = _detect_parties(text)
+    return owner, tenant
+
+
+_PROPERTY_PRIMERA_RE = _compile_linear(
+    r"\bPRIMERA\b.{0,1000}?\bun\s+departamento\s+ubicado\s+en\s+la\s+calle\s+(?P<addr>.{1,300}?)(?:\.\s|---|\n)",
+    re.IGNORECASE | re.DOTALL
+)
+_PROPERTY_GENERIC_RE = _compile_linear(
+    r"\b(departamento|inmueble|unidad)\b.{0,300}?\bubicad[oa]\s+en\s+la\s+calle\s+(?P<addr>.{1,300}?)(?:\.\s|---|\n)",
+    re.IGNORECASE | re.DOTALL
+)
+_PROPERTY_UBICADO_RE = _compile_linear(
+    r"\bubicad[oa]\s+en\s+la\s+calle\s+(?P<addr>.{1,300}?)(?:\.\s|---|\n)",
+    re.IGNORECASE | re.DOTALL
+)
+
+
+def _detect_property_label(text: str) -> Tuple[Optional[str], bool]:
     """
     Prioriza PRIMERA (objeto del contrato), luego patrón genérico de "ubicado en la calle".
     Evita tomar domicilios del locador (ej: Juramento 3183).
+    El bool indica si salió de PRIMERA (definitivo con más texto).
     """
     t = text
 
     # 1) PRIMERA: "un departamento ubicado en la calle ..."
-    m = re.search(
-        r"\bPRIMERA\b.*?\bun\s+departamento\s+ubicado\s+en\s+la\s+calle\s+(?P<addr>.+?)(?:\.\s|---|\n)",
-        t,
-        re.IGNORECASE | re.DOTALL
-    )
+    m = _PROPERTY_PRIMERA_RE.search(t)
     if m:
         addr = normalize(m.group("addr"))
         addr = addr.replace("“", "").replace("”", "").replace('"', "")
         addr = addr.strip(" ,;-")
-        return addr[:140]
+        return addr[:140], True
 
     # 2) Genérico: departamento/inmueble/unidad + ubicado en la calle
-    m = re.search(
-        r"\b(departamento|inmueble|unidad)\b.*?\bubicad[oa]\s+en\s+la\s+calle\s+(?P<addr>.+?)(?:\.\s|---|\n)",
-        t,
-        re.IGNORECASE | re.DOTALL
-    )
+    m = _PROPERTY_GENERIC_RE.search(t)
     if m:
         addr = normalize(m.group("addr"))
         addr = addr.replace("“", "").replace("”", "").replace('"', "")
         addr = addr.strip(" ,;-")
-        return addr[:140]
+        return addr[:140], False
 
     # 3) Variante: ubicado en la calle ...
-    m = re.search(
-        r"\bubicad[oa]\s+en\s+la\s+calle\s+(?P<addr>.+?)(?:\.\s|---|\n)",
-        t,
-        re.IGNORECASE | re.DOTALL
-    )
+    m = _PROPERTY_UBICADO_RE.search(t)
     if m:
         addr = normalize(m.group("addr"))
         addr = addr.replace("“", "").replace("”", "").replace('"', "")
         addr = addr.strip(" ,;-")
-        return addr[:140]
+        return addr[:140], False
 
-    return None
+    return None, False
+
+
+def detect_property_label(text: str) -> Optional[str]:
+    return _detect_property_label(text)[0]
+
+
+_DDMMYYYY_RE = re.compile(r"\b(\d{1,2})[\/\-](\d{1,2})[\/\-](\d{4})\b")
+_TEXT_DATE_RE = re.compile(
+    r"\b(\d{1,2})\s*(?:°|º)?\s+de\s+([a-záéíóúñ]+)\s+(?:del|de)\s+(\d{4})\b",
+    re.IGNORECASE
+)
+
+
+def _ddmmyyyy_iso(dd: str, mm: str, yy: str) -> str:
+    return f"{yy}-{int(mm):02d}-{int(dd):02d}"
 
 
 def _parse_ddmmyyyy(s: str) -> Optional[str]:
-    m = re.search(r"\b(\d{1,2})[\/\-](\d{1,2})[\/\-](\d{4})\b", s)
+    m = _DDMMYYYY_RE.search(s)
     if not m:
         return None
-    dd, mm, yy = m.groups()
-    return f"{yy}-{int(mm):02d}-{int(dd):02d}"
+    return _ddmmyyyy_iso(*m.groups())
 
 
 def _parse_text_date(s: str) -> Optional[str]:
@@ -235,11 +565,7 @@ def _parse_text_date(s: str) -> Optional[str]:
     - "1° de febrero del 2026"
     - "31 de enero de 2028"
     """
-    m = re.search(
-        r"\b(\d{1,2})\s*(?:°|º)?\s+de\s+([a-záéíóúñ]+)\s+(?:del|de)\s+(\d{4})\b",
-        s,
-        re.IGNORECASE
-    )
+    m = _TEXT_DATE_RE.search(s)
     if not m:
         return None
     dd, mon, yy = m.groups()
@@ -249,82 +575,88 @@ def _parse_text_date(s: str) -> Optional[str]:
     return f"{yy}-{mm}-{int(dd):02d}"
 
 
-def detect_dates(text: str) -> Tuple[Optional[str], Optional[str]]:
+_DATES_COMENZANDO_RE = _compile_linear(
+    r"\bcomenzando\s+el\s+(?P<sd>\d{1,2})[\/\-](?P<sm>\d{1,2})[\/\-](?P<sy>\d{4}).{0,200}?"
+    r"\bfinalizando\s+el\s+(?P<ed>\d{1,2})[\/\-](?P<em>\d{1,2})[\/\-](?P<ey>\d{4})\b",
+    re.IGNORECASE | re.DOTALL
+)
+_DATES_A_PARTIR_RE = _compile_linear(
+    r"\ba\s+partir\s+del\s+d[ií]a\s+(?P<start>[^,;\n]{0,80}).{0,260}?\bel\s+d[ií]a\s+(?P<end>[^,;\n]{0,80})\b",
+    re.IGNORECASE | re.DOTALL
+)
+_DATES_START_RE = _compile_linear(
+    r"\b(inicia|comienza|a\s+partir\s+del)\b.{0,120}?(?P<dd>\d{1,2})[\/\-](?P<mm>\d{1,2})[\/\-](?P<yy>\d{4})",
+    re.IGNORECASE | re.DOTALL
+)
+_DATES_END_RE = _compile_linear(
+    r"\b(finaliza|termina|vence|hasta)\b.{0,120}?(?P<dd>\d{1,2})[\/\-](?P<mm>\d{1,2})[\/\-](?P<yy>\d{4})",
+    re.IGNORECASE | re.DOTALL
+)
+_DATES_SIGNED_RE = _compile_linear(
+    r"\b(\d{1,2})\s+d[ií]as?\s+del\s+mes\s+de\s+([a-záéíóúñ]+)\s+de\s+(\d{4})\b",
+    re.IGNORECASE
+)
+_DATES_PLAZO_RE = _compile_linear(
+    r"\bplazo\s+de\s+(?:[A-ZÁÉÍÓÚÑa-záéíóúñ]+\s*)?\(?\s*(\d{1,2})\s*\)?\s*(meses|años)\b",
+    re.IGNORECASE
+)
+
+
+def _detect_dates(text: str) -> Tuple[Optional[str], Optional[str], bool]:
     """
     Prioridad:
     1) 'comenzando el dd/mm/yyyy ... finalizando el dd/mm/yyyy'
     2) Caso frecuente en contratos AR: "a partir del día X ... vencerá ... el día Y" (con meses en texto)
     3) inicio/fin explícitos en dd/mm/yyyy
     4) fecha de firma en texto + plazo (si aplica)
+    El bool indica si salió de 1) (definitivo con más texto).
     """
     t = text
 
     # 1) comenzando/finalizando
-    m = re.search(
-        r"\bcomenzando\s+el\s+(?P<start>\d{1,2}[\/\-]\d{1,2}[\/\-]\d{4}).{0,200}?\bfinalizando\s+el\s+(?P<end>\d{1,2}[\/\-]\d{1,2}[\/\-]\d{4})\b",
-        t,
-        re.IGNORECASE | re.DOTALL
-    )
+    m = _DATES_COMENZANDO_RE.search(t)
     if m:
-        return _parse_ddmmyyyy(m.group("start")), _parse_ddmmyyyy(m.group("end"))
+        # el patrón ya separa día/mes/año: no hace falta volver a parsear la fecha
+        return (
+            _ddmmyyyy_iso(m.group("sd"), m.group("sm"), m.group("sy")),
+            _ddmmyyyy_iso(m.group("ed"), m.group("em"), m.group("ey")),
+            True,
+        )
 
     # 2) "a partir del día X ... el día Y"
-    m = re.search(
-        r"\ba\s+partir\s+del\s+d[ií]a\s+(?P<start>[^,;\n]{0,80}).{0,260}?\bel\s+d[ií]a\s+(?P<end>[^,;\n]{0,80})\b",
-        t,
-        re.IGNORECASE | re.DOTALL
-    )
+    m = _DATES_A_PARTIR_RE.search(t)
     if m:
         start_raw = m.group("start")
         end_raw = m.group("end")
         start = _parse_text_date(start_raw) or _parse_ddmmyyyy(start_raw)
         end = _parse_text_date(end_raw) or _parse_ddmmyyyy(end_raw)
-        return start, end
+        return start, end, False
 
     start = None
     end = None
 
     # 3) inicio explícito dd/mm/yyyy
-    m = re.search(
-        r"\b(inicia|comienza|a\s+partir\s+del)\b.{0,120}?(?P<d>\d{1,2}[\/\-]\d{1,2}[\/\-]\d{4})",
-        t,
-        re.IGNORECASE | re.DOTALL
-    )
+    m = _DATES_START_RE.search(t)
     if m:
-        start = _parse_ddmmyyyy(m.group("d"))
+        start = _ddmmyyyy_iso(m.group("dd"), m.group("mm"), m.group("yy"))
 
     # 3) fin explícito dd/mm/yyyy
-    m = re.search(
-        r"\b(finaliza|termina|vence|hasta)\b.{0,120}?(?P<d>\d{1,2}[\/\-]\d{1,2}[\/\-]\d{4})",
-        t,
-        re.IGNORECASE | re.DOTALL
-    )
+    m = _DATES_END_RE.search(t)
     if m:
-        end = _parse_ddmmyyyy(m.group("d"))
-
-    # 4) fecha de firma en texto (fallback)
-    signed = None
-    m = re.search(
-        r"\b(\d{1,2})\s+d[ií]as?\s+del\s+mes\s+de\s+([a-záéíóúñ]+)\s+de\s+(\d{4})\b",
-        t,
-        re.IGNORECASE
-    )
-    if m:
-        dd, mon, yy = m.groups()
-        mm = MONTHS.get(mon.lower())
-        if mm:
-            signed = f"{yy}-{mm}-{int(dd):02d}"
+        end = _ddmmyyyy_iso(m.group("dd"), m.group("mm"), m.group("yy"))
 
+    # 4) fecha de firma en texto (fallback): solo se busca si falta el inicio
     if start is None:
-        start = signed
+        m = _DATES_SIGNED_RE.search(t)
+        if m:
+            dd, mon, yy = m.groups()
+            mm = MONTHS.get(mon.lower())
+            if mm:
+                start = f"{yy}-{mm}-{int(dd):02d}"
 
     # Si no hay end pero hay plazo -> calcular
     if end is None and start is not None:
-        pm = re.search(
-            r"\bplazo\s+de\s+(?:[A-ZÁÉÍÓÚÑa-záéíóúñ]+\s*)?\(?\s*(\d{1,2})\s*\)?\s*(meses|años)\b",
-            t,
-            re.IGNORECASE
-        )
+        pm = _DATES_PLAZO_RE.search(t)
         if pm:
             n = int(pm.group(1))
             unit = pm.group(2).lower()
@@ -333,70 +665,111 @@ def detect_dates(text: str) -> Tuple[Optional[str], Optional[str]]:
             d1 = _add_months(d0, months)
             end = d1.isoformat()
 
+    return start, end, False
+
+
+def detect_dates(text: str) -> Tuple[Optional[str], Optional[str]]:
+    start, end, _ = _detect_dates(text)
     return start, end
 
 
-def detect_amount_currency(text: str) -> Tuple[Optional[float], str]:
+_AMOUNT_LABEL_ALTS = [r"alquiler\s+mensual", r"canon\s+locativo", r"precio\s+del\s+alquiler", r"valor\s+mensual"]
+_AMOUNT_LABEL = r"\b(" + "|".join(_AMOUNT_LABEL_ALTS) + r")\b"
+# un patrón por rótulo: los rótulos se pisan ("precio del alquiler mensual") y un
+# finditer del rótulo combinado se saltearía "alquiler mensual"; cada rótulo por
+# separado no se solapa consigo mismo, así que entre todos dan todas las posiciones
+_AMOUNT_LABEL_RES = [_compile_linear(rf"\b{alt}\b", re.IGNORECASE) for alt in _AMOUNT_LABEL_ALTS]
+# en orden de preferencia; el número va siempre en el grupo "num".
+# Quedan en `re` a propósito: se prueban anclados en cada rótulo (match(t, pos)) y el
+# wrapper de RE2 re-codifica el texto entero a UTF-8 en cada llamada, O(rótulos × N).
+# Con `re` cada intento está acotado por los .{0,n}? (no hay backtracking sin límite).
+_AMOUNT_PATTERNS = [
+    (re.compile(pat, re.IGNORECASE | re.DOTALL), cur)
+    for pat, cur in [
+        # "El alquiler mensual ... ($ 650.000) por mes"
+        (_AMOUNT_LABEL + r".{0,180}?\(\s*\$\s*(?P<num>[\d\.\,]+)\s*\)", "ARS"),
+        (_AMOUNT_LABEL + r".{0,120}?\$\s*(?P<num>[\d\.\,]+)", "ARS"),
+        (_AMOUNT_LABEL + r".{0,180}?\bpesos\b.{0,60}?\(\s*\$\s*(?P<num>[\d\.\,]+)\s*\)", "ARS"),
+        (_AMOUNT_LABEL + r".{0,120}?\bpesos\b.{0,40}?(?P<num>[\d\.\,]+)", "ARS"),
+        # USD
+        (_AMOUNT_LABEL + r".{0,180}?\b(USD|U\$S)\b\s*(?P<num>[\d\.\,]+)", "USD"),
+        (_AMOUNT_LABEL + r".{0,180}?(?P<num>[\d\.\,]+)\s*\b(USD|U\$S)\b", "USD"),
+    ]
+]
+_AMOUNT_PENALTY_RE = _compile_linear(r"\bmulta\b|\bpenalidad\b|\bdep[oó]sito\b|\bgarant[ií]a\b", re.IGNORECASE)
+
+
+def _detect_amount_currency(text: str) -> Tuple[Optional[float], str, bool]:
     """
     Extrae canon locativo/alquiler mensual con patrones guiados.
     Evita depósitos/multas/garantías.
+    Gana el primer match (en orden de patrón y de texto) que no menciona
+    multa/depósito/garantía; si todos la mencionan, el primero de todos.
+    El bool indica si ganó el primer patrón sin multa/depósito/garantía: es
+    el único resultado que más texto al final no puede desplazar.
     """
-    t = text.replace("\u00a0", " ")
-    candidates: List[Dict[str, Any]] = []
+    # sin copiar el texto reemplazando \xa0: todos los patrones usan \s, que ya lo
+    # incluye en los dos motores (ver _RE2_SPACE)
+    t = text
 
-    patterns = [
-        # "El alquiler mensual ... ($ 650.000) por mes"
-        (r"\b(alquiler\s+mensual|canon\s+locativo|precio\s+del\s+alquiler|valor\s+mensual)\b.{0,180}?\(\s*\$\s*([\d\.\,]+)\s*\)", "ARS"),
-        (r"\b(alquiler\s+mensual|canon\s+locativo|precio\s+del\s+alquiler|valor\s+mensual)\b.{0,120}?\$\s*([\d\.\,]+)", "ARS"),
-        (r"\b(alquiler\s+mensual|canon\s+locativo|precio\s+del\s+alquiler|valor\s+mensual)\b.{0,180}?\bpesos\b.{0,60}?\(\s*\$\s*([\d\.\,]+)\s*\)", "ARS"),
-        (r"\b(alquiler\s+mensual|canon\s+locativo|precio\s+del\s+alquiler|valor\s+mensual)\b.{0,120}?\bpesos\b.{0,40}?([\d\.\,]+)", "ARS"),
-        # USD
-        (r"\b(alquiler\s+mensual|canon\s+locativo|precio\s+del\s+alquiler|valor\s+mensual)\b.{0,180}?\b(USD|U\$S)\b\s*([\d\.\,]+)", "USD"),
-        (r"\b(alquiler\s+mensual|canon\s+locativo|precio\s+del\s+alquiler|valor\s+mensual)\b.{0,180}?([\d\.\,]+)\s*\b(USD|U\$S)\b", "USD"),
-    ]
+    # todos los patrones empiezan con el rótulo: se buscan los rótulos (una pasada
+    # por rótulo) y cada patrón se prueba anclado solo en esas posiciones
+    labels = sorted(m.start() for label_re in _AMOUNT_LABEL_RES for m in label_re.finditer(t))
+    if not labels:
+        return None, "ARS", False
+
+    fallback: Optional[Tuple[float, str]] = None
+    for i, (pattern, cur) in enumerate(_AMOUNT_PATTERNS):
+        end = 0
+        for pos in labels:
+            # mismos matches que finditer: no se solapan con el anterior del patrón
+            if pos < end:
+                continue
+            m = pattern.match(t, pos)
+            if not m:
+                continue
+            end = m.end()
+
+            try:
+                num = float(m.group("num").replace(".", "").replace(",", "."))
+            except ValueError:
+                # solo puntos/comas, sin dígitos
+                continue
+
+            if not _AMOUNT_PENALTY_RE.search(m.group(0)):
+                return num, cur, i == 0
+            if fallback is None:
+                fallback = (num, cur)
+
+    if fallback is None:
+        return None, "ARS", False
+    return fallback[0], fallback[1], False
 
-    for pat, cur in patterns:
-        for m in re.finditer(pat, t, flags=re.IGNORECASE | re.DOTALL):
-            chunk = m.group(0).lower()
-            penalty = 0
-            if re.search(r"\bmulta\b|\bpenalidad\b|\bdep[oó]sito\b|\bgarant[ií]a\b", chunk, re.IGNORECASE):
-                penalty += 6
-            score = 10 - penalty
-
-            num_raw = None
-            if cur == "USD":
-                if m.lastindex and m.lastindex >= 3:
-                    num_raw = m.group(3)
-                elif m.lastindex and m.lastindex >= 2:
-                    num_raw = m.group(2)
-            else:
-                if m.lastindex and m.lastindex >= 2:
-                    num_raw = m.group(2)
 
-            if num_raw:
-                num = float(num_raw.replace(".", "").replace(",", "."))
-                candidates.append({"score": score, "amount": num, "currency": cur})
+def detect_amount_currency(text: str) -> Tuple[Optional[float], str]:
+    amount, currency, _ = _detect_amount_currency(text)
+    return amount, currency
 
-    if not candidates:
-        return None, "ARS"
 
-    best = sorted(candidates, key=lambda x: x["score"], reverse=True)[0]
-    return best["amount"], best["currency"]
+# case-insensitive sobre el texto original: evita la copia en minúsculas del documento entero
+_ADJ_IPC_RE = _compile_linear(r"ipc|[íi]ndice de precios", re.IGNORECASE)
+_ADJ_QUARTERLY_RE = _compile_linear(r"\btrimestr|\bcada\s+tres\s*\(?.?3\)?\s+mes", re.IGNORECASE)
+_ADJ_MONTHLY_RE = _compile_linear(r"\bmensual|\bcada\s+un\s*\(?.?1\)?\s+mes", re.IGNORECASE)
 
 
 def detect_adjustment(text: str, currency: str) -> Dict[str, Any]:
-    t = text.lower()
-
     if currency != "ARS":
         return {"type": "NONE"}
 
-    if "ipc" not in t and "índice de precios" not in t and "indice de precios" not in t:
+    t = text
+
+    if not _ADJ_IPC_RE.search(t):
         return {"type": "NONE"}
 
-    if re.search(r"\btrimestr", t) or re.search(r"\bcada\s+tres\s*\(?.?3\)?\s+mes", t):
+    if _ADJ_QUARTERLY_RE.search(t):
         return {"type": "IPC_QUARTERLY", "frequencyMonths": 3}
 
-    if re.search(r"\bmensual", t) or re.search(r"\bcada\s+un\s*\(?.?1\)?\s+mes", t):
+    if _ADJ_MONTHLY_RE.search(t):
         return {"type": "IPC_MONTHLY", "frequencyMonths": 1}
 
     return {"type": "IPC_QUARTERLY", "frequencyMonths": 3}
@@ -406,16 +779,33 @@ def detect_adjustment(text: str, currency: str) -> Dict[str, Any]:
 # API
 # =========================
 
+# RE2 arma sus autómatas de a poco, la primera vez que cada patrón recorre texto:
+# se corre la extracción sobre un contrato corto al arrancar para no cobrárselo
+# entero al primer /extract. docx/pdfium se importan arriba del módulo.
+_WARMUP_TEXT = (
+    "CONTRATO DE LOCACIÓN. Entre Juan Pérez con DNI 20.123.456, en adelante denominado "
+    "\"EL LOCADOR\", por una parte, y por la otra María Gómez, con DNI 30.654.321, en adelante "
+    "denominada \"EL LOCATARIO\". PRIMERA: un departamento ubicado en la calle Av. Siempre Viva 742. "
+    "SEGUNDA: el plazo de veinticuatro (24) meses, comenzando el 01/02/2026 y finalizando el 31/01/2028. "
+    "a partir del día 1 de febrero de 2026 hasta el día 31 de enero de 2028. "
+    "TERCERA: el alquiler mensual será de pesos seiscientos mil ($ 650.000) por mes, "
+    "ajustable cada tres (3) meses por IPC. Depósito en garantía USD 1.000.\n"
+    "Firmado a los 10 días del mes de enero de 2026.\n"
+)
+
+
+def warm_up() -> None:
+    extract_fields(_WARMUP_TEXT)
+    extract_fields(_WARMUP_TEXT.upper())
+    extract_fields_incremental([_WARMUP_TEXT])
+
+
 @app.get("/health")
 def health():
     return {"ok": True}
 
 
-@app.post("/extract")
-async def extract(file: UploadFile = File(...)):
-    content = await file.read()
-    text = extract_text_from_file(content, file.filename)
-
+def extract_fields(text: str) -> Dict[str, Any]:
     owner, tenant = detect_parties(text)
     property_label = detect_property_label(text)
     start_date, end_date = detect_dates(text)
@@ -423,15 +813,176 @@ async def extract(file: UploadFile = File(...)):
     adjustment = detect_adjustment(text, currency)
 
     return {
-        "extracted": {
-            "propertyLabel": property_label,
-            "ownerName": owner,
-            "tenantName": tenant,
-            "startDate": start_date,
-            "endDate": end_date,
-            "amount": amount,
-            "currency": currency,
-            "adjustment": adjustment,
-        },
+        "propertyLabel": property_label,
+        "ownerName": owner,
+        "tenantName": tenant,
+        "startDate": start_date,
+        "endDate": end_date,
+        "amount": amount,
+        "currency": currency,
+        "adjustment": adjustment,
+    }
+
+
+# DOCX/texto no tienen páginas: se prueba primero con el principio del documento
+# (donde están partes, objeto, plazo y precio) y se re-escanea el texto entero si
+# falta algún campo, si alguno salió de un fallback (un "depósito $ X" en el head no
+# le gana al alquiler de más adelante) o si el ajuste todavía puede cambiar (la
+# cláusula de IPC suele estar más adelante), igual que con las páginas de un PDF
+HEAD_CHARS = int(os.getenv("IA_HEAD_CHARS", "8192"))
+
+
+def split_head(text: str) -> List[str]:
+    if len(text) <= HEAD_CHARS:
+        return [text]
+    # se corta en un fin de línea para no partir una cláusula (ni un monto) al medio
+    cut = text.rfind("\n", 0, HEAD_CHARS)
+    if cut <= 0:
+        return [text]
+    return [text[:cut], text[cut:]]
+
+
+def extract_fields_incremental(pages: Iterable[str], sep: str = "\n") -> Tuple[str, Dict[str, Any]]:
+    """
+    Corre los detectores a medida que llegan páginas y corta cuando ya están
+    partes, objeto, fechas y monto y ninguno puede cambiar con más texto.
+    Un resultado es definitivo solo si salió de la regla de mayor prioridad del
+    detector: un fallback (depósito como monto, partes por firmas, fecha de firma
+    como inicio...) lo puede desplazar una regla mejor en una página posterior, así
+    que se vuelve a calcular sobre el texto acumulado (los patrones pueden cruzar
+    páginas). Al terminar el documento sin cortar, el resultado es el de extract_fields.
+    Se escanea después de las páginas 1, 2, 4, 8... y al final del documento:
+    re-escanear en cada página es cuadrático cuando falta algún campo.
+    """
+    parts: List[str] = []
+    owner = tenant = property_label = start_date = end_date = amount = None
+    currency = "ARS"
+    parties_final = property_final = dates_final = amount_final = False
+    # detect_adjustment mira el texto entero (IPC y frecuencia pueden estar en
+    # cláusulas distintas): su resultado solo es definitivo en USD o con IPC trimestral
+    ipc_seen = quarterly_seen = False
+    text = ""
+
+    pages = iter(pages)
+    scanned = 0
+    scan_at = 1
+    while True:
+        page = next(pages, None)
+        if page is None:
+            # fin del documento: solo falta escanear si quedaron páginas sin ver
+            if len(parts) == scanned:
+                break
+        else:
+            parts.append(page)
+            if len(parts) < scan_at:
+                continue
+            scan_at = 2 * len(parts)
+
+        text = sep.join(parts)
+        scanned = len(parts)
+
+        if not parties_final:
+            owner, tenant, parties_final = _detect_parties(text)
+        if not property_final:
+            property_label, property_final = _detect_property_label(text)
+        if not dates_final:
+            start_date, end_date, dates_final = _detect_dates(text)
+        if not amount_final:
+            amount, currency, amount_final = _detect_amount_currency(text)
+        if currency == "ARS":
+            ipc_seen = ipc_seen or _ADJ_IPC_RE.search(text) is not None
+            quarterly_seen = quarterly_seen or _ADJ_QUARTERLY_RE.search(text) is not None
+        adjustment_final = currency != "ARS" or (ipc_seen and quarterly_seen)
+
+        core_found = None not in (owner, tenant, property_label, start_date, end_date, amount)
+        core_final = parties_final and property_final and dates_final and amount_final
+        if page is None or (core_found and core_final and adjustment_final):
+            break
+
+    return text, {
+        "propertyLabel": property_label,
+        "ownerName": owner,
+        "tenantName": tenant,
+        "startDate": start_date,
+        "endDate": end_date,
+        "amount": amount,
+        "currency": currency,
+        "adjustment": detect_adjustment(text, currency),
+    }
+
+
+# mismo tope que el backend (MAX_UPLOAD_MB): se rechaza antes de abrir el PDF/DOCX
+MAX_UPLOAD_BYTES = int(os.getenv("IA_MAX_UPLOAD_MB", "20")) * 1024 * 1024
+# margen para boundaries y headers del multipart sobre el tamaño del archivo
+_MULTIPART_OVERHEAD = 64 * 1024
+
+
+@app.middleware("http")
+async def reject_large_uploads(request: Request, call_next):
+    # por Content-Length, antes de que Starlette spoolee el body entero al parsear
+    # el form; file.size en /extract queda como respaldo para uploads chunked
+    length = request.headers.get("content-length")
+    if length is not None and length.isdigit() and int(length) > MAX_UPLOAD_BYTES + _MULTIPART_OVERHEAD:
+        return ORJSONResponse({"detail": "Archivo demasiado grande"}, status_code=413)
+    return await call_next(request)
+
+
+# resultados por hash del archivo: re-subir el mismo contrato no lo vuelve a
+# parsear. Cache por proceso; IA_EXTRACT_CACHE_SIZE=0 lo desactiva.
+EXTRACT_CACHE_SIZE = int(os.getenv("IA_EXTRACT_CACHE_SIZE", "128"))
+_extract_cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+_extract_cache_lock = threading.Lock()
+
+
+def _file_digest(stream: BinaryIO) -> str:
+    # hash en bloques sobre el stream del upload y rebobina para parsearlo
+    h = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(64 * 1024), b""):
+        h.update(chunk)
+    stream.seek(0)
+    return h.hexdigest()
+
+
+@app.post("/extract")
+def extract(file: UploadFile = File(...)):
+    # respaldo del middleware: sin Content-Length (chunked) solo se sabe acá
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Archivo demasiado grande")
+
+    # Starlette ya dejó el upload en un SpooledTemporaryFile (disco si es grande):
+    # se parsea desde ahí en vez de copiarlo entero a bytes
+    content = file.file
+    content.seek(0)
+
+    # el mismo archivo se parsea distinto según la extensión
+    kind = file_kind(file.filename)
+
+    cache_key = None
+    if EXTRACT_CACHE_SIZE > 0:
+        cache_key = (_file_digest(content), kind)
+        with _extract_cache_lock:
+            cached = _extract_cache.get(cache_key)
+            if cached is not None:
+                _extract_cache.move_to_end(cache_key)
+                return cached
+
+    if kind == "pdf":
+        # closing: el corte temprano cierra el documento en este hilo, no desde el GC
+        with closing(iter_pdf_pages(content)) as pages:
+            text, extracted = extract_fields_incremental(pages)
+    else:
+        text = extract_text_from_file(content, kind)
+        text, extracted = extract_fields_incremental(split_head(text), sep="")
+
+    result = {
+        "extracted": extracted,
         "textPreview": text[:800],
-    }
\ No newline at end of file
+    }
+
+    if cache_key is not None:
+        with _extract_cache_lock:
+            _extract_cache[cache_key] = result
+            if len(_extract_cache) > EXTRACT_CACHE_SIZE:
+                _extract_cache.popitem(last=False)
+
+    return result
\ No newline at end of file
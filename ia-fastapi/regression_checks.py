@@ -0,0 +1,304 @@
+# Chequeos de regresión del extractor (sin dependencias extra):
+#   cd ia-fastapi && python regression_checks.py
+# Sale con error si algún caso da otro resultado o se pasa del tiempo tope.
+import io
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from app.main import (
+    HEAD_CHARS,
+    _iter_pdf_pages_pdfium,
+    _iter_pdf_pages_pypdf,
+    detect_amount_currency,
+    detect_parties,
+    detect_property_label,
+    extract_fields,
+    extract_fields_incremental,
+    extract_text_from_docx,
+    iter_pdf_pages,
+    split_head,
+)
+
+# =========================
+# Monto: muchos rótulos sin monto
+# =========================
+# los patrones de monto se prueban anclados en cada rótulo: el costo tiene que
+# crecer con rótulos × ventana acotada, no con rótulos × largo del documento
+AMOUNT_TEXT_CHARS = 200_000
+AMOUNT_MAX_SECONDS = 1.0
+
+
+def _label_dense_text(labels: int, label: str = "valor mensual a convenir. ") -> str:
+    # `labels` rótulos repartidos en un texto de AMOUNT_TEXT_CHARS, sin ningún monto
+    unit = label.ljust(AMOUNT_TEXT_CHARS // labels, " ")
+    return (unit * labels).ljust(AMOUNT_TEXT_CHARS, " ")
+
+
+def check_amount_label_dense() -> None:
+    cases = [
+        ("100 rótulos", _label_dense_text(100)),
+        ("1500 rótulos", _label_dense_text(1500)),
+        ("4000 rótulos + pesos", _label_dense_text(4000, "valor mensual pesos pesos pesos pesos pesos pesos ")),
+    ]
+    for name, text in cases:
+        t0 = time.perf_counter()
+        result = detect_amount_currency(text)
+        elapsed = time.perf_counter() - t0
+        print(f"amount {name}: {elapsed * 1000:.1f} ms")
+        assert result == (None, "ARS"), (name, result)
+        assert elapsed < AMOUNT_MAX_SECONDS, (name, elapsed)
+
+
+def check_amount_nested_labels() -> None:
+    # "precio del alquiler mensual": el monto puede quedar a tiro solo del rótulo de
+    # adentro ("alquiler mensual"), igual que con finditer sobre el texto entero
+    cases = [
+        ("El precio del alquiler mensual" + " " * 115 + "$ 500.000", (500000.0, "ARS")),
+        ("El precio del alquiler mensual será de $ 500.000", (500000.0, "ARS")),
+    ]
+    for text, expected in cases:
+        result = detect_amount_currency(text)
+        assert result == expected, (text, result)
+    print("amount rótulos anidados: ok")
+
+
+# =========================
+# \b junto a letras acentuadas
+# =========================
+# el \b de RE2 es solo ASCII (á, ñ no son letras): los resultados tienen que ser
+# los de `re`, que sí las toma como letras
+def check_accented_boundaries() -> None:
+    cases = [
+        # "entre" pegado a "está" (texto de PDF sin espacio): para `re` no hay borde
+        (
+            detect_parties,
+            "Lo firmó quien estáentre Juan Perez con DNI 1 por una parte, y por la otra Ana Ruiz, de nacionalidad argentina",
+            (None, None),
+        ),
+        (detect_property_label, "El local ahíubicado en la calle Corrientes 100. ", None),
+        # nombres que empiezan o terminan con letra acentuada
+        (
+            detect_parties,
+            "Entre Ángel Pérez con DNI 1 por una parte, y por la otra Ñoño Ruiz, de nacionalidad argentina",
+            ("Ángel Pérez", "Ñoño Ruiz"),
+        ),
+    ]
+    for detect, text, expected in cases:
+        result = detect(text)
+        assert result == expected, (text, result)
+    print("\\b con acentos: ok")
+
+
+# =========================
+# Ajuste: cláusula de IPC después de los campos principales
+# =========================
+# el corte temprano no puede cambiar el ajuste: tiene que dar lo mismo que el texto entero
+CONTRACT_HEAD = """CONTRATO DE LOCACION
+Entre Juan Carlos Perez con DNI 20.123.456, en adelante denominado "EL LOCADOR" por una parte, y por la otra Maria Gomez, de nacionalidad argentina, con DNI 30.111.222, en adelante denominada "EL LOCATARIO", convienen:
+PRIMERA: El LOCADOR da en locación un departamento ubicado en la calle Santos Dumont 3456, piso 2 depto B. Con todas sus instalaciones.
+SEGUNDA: El plazo se pacta comenzando el 01/02/2026 y finalizando el 31/01/2028.
+TERCERA: El alquiler mensual será de pesos seiscientos cincuenta mil ($ 650.000) por mes."""
+ADJUSTMENT_CLAUSES = [
+    ("CUARTA: El precio se ajustará cada tres (3) meses por IPC.", "IPC_QUARTERLY"),
+    ("CUARTA: El precio se actualizará según el índice de precios (IPC).", "IPC_MONTHLY"),
+    ("CUARTA: Sin ajuste.", "NONE"),
+]
+
+
+def check_adjustment_after_core_fields_pdf() -> None:
+    for clause, expected in ADJUSTMENT_CLAUSES:
+        pages = [CONTRACT_HEAD, "Cláusulas generales.\n" * 50, clause]
+        full = extract_fields("\n".join(pages))
+        _, extracted = extract_fields_incremental(pages)
+        assert full["adjustment"]["type"] == expected, (clause, full["adjustment"])
+        assert extracted == full, (clause, extracted, full)
+    print("adjustment pdf: ok")
+
+
+def check_adjustment_after_head_docx() -> None:
+    # DOCX/texto: los campos principales en el head, el ajuste después de HEAD_CHARS
+    filler = "Cláusulas generales del contrato de locación.\n" * (HEAD_CHARS // 40)
+    for clause, expected in ADJUSTMENT_CLAUSES:
+        text = CONTRACT_HEAD + "\n" + filler + clause
+        assert text.find(clause) > HEAD_CHARS
+        full = extract_fields(text)
+        _, extracted = extract_fields_incremental(split_head(text), sep="")
+        assert full["adjustment"]["type"] == expected, (clause, full["adjustment"])
+        assert extracted == full, (clause, extracted, full)
+    print("adjustment docx/texto: ok")
+
+
+# =========================
+# Fallbacks: una regla mejor en una página posterior
+# =========================
+# un valor de fallback en las primeras páginas no puede quedar fijo: con todo el
+# documento leído, el resultado tiene que ser el mismo que sobre el texto entero
+FALLBACK_CASES = [
+    # el depósito es el fallback del monto; el alquiler está más adelante
+    (
+        "amount",
+        650000.0,
+        "Se entrega un depósito en garantía equivalente al alquiler mensual de $ 500.000.",
+        "TERCERA: El alquiler mensual será de pesos seiscientos cincuenta mil ($ 650.000) por mes.",
+    ),
+    # partes por firmas / "X con DNI" antes del encabezado con "de nacionalidad"
+    (
+        "ownerName",
+        "Juan Carlos Perez",
+        "Firmas anticipadas de Pedro Lopez con DNI 1 y de Ana Ruiz con DNI 2.",
+        CONTRACT_HEAD.split("\n")[1],
+    ),
+    # la fecha de firma es el fallback del inicio; el plazo explícito viene después
+    (
+        "startDate",
+        "2026-02-01",
+        "Firmado a los 10 días del mes de enero de 2026, por un plazo de veinticuatro (24) meses.",
+        "SEGUNDA: El plazo se pacta comenzando el 01/02/2026 y finalizando el 31/01/2028.",
+    ),
+]
+
+
+def check_fallback_then_primary_pdf() -> None:
+    for field, expected, early, late in FALLBACK_CASES:
+        pages = [early, "Cláusulas generales.\n" * 50, late]
+        full = extract_fields("\n".join(pages))
+        _, extracted = extract_fields_incremental(pages)
+        assert full[field] == expected, (field, full)
+        assert extracted == full, (field, extracted, full)
+    print("fallback pdf: ok")
+
+
+def check_fallback_then_primary_docx() -> None:
+    # DOCX/texto: el fallback en el head (primeros HEAD_CHARS), la regla mejor después
+    filler = "Cláusulas generales del contrato de locación.\n" * (HEAD_CHARS // 40)
+    for field, expected, early, late in FALLBACK_CASES:
+        text = early + "\n" + filler + late
+        assert text.find(late) > HEAD_CHARS
+        full = extract_fields(text)
+        _, extracted = extract_fields_incremental(split_head(text), sep="")
+        assert full[field] == expected, (field, full)
+        assert extracted == full, (field, extracted, full)
+    print("fallback docx/texto: ok")
+
+
+# =========================
+# PDF: uploads concurrentes
+# =========================
+# /extract corre en el threadpool y PDFium no es thread-safe: sin el lock, varios
+# hilos leyendo PDFs a la vez terminan en segfault del proceso
+PDF_THREADS = 16
+PDF_ROUNDS = 50
+
+
+def _pdf_escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _minimal_pdf(pages: List[str]) -> bytes:
+    # PDF armado a mano (Helvetica, una línea de texto por renglón), sin dependencias extra
+    n = len(pages)
+    font_id = 3 + 2 * n
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(n))
+    objs = [b"<< /Type /Catalog /Pages 2 0 R >>", f"<< /Type /Pages /Kids [{kids}] /Count {n} >>".encode()]
+    for i, page in enumerate(pages):
+        lines = "".join(f"({_pdf_escape(line)}) Tj T* " for line in page.split("\n"))
+        stream = f"BT /F1 9 Tf 11 TL 40 800 Td {lines}ET".encode("cp1252")
+        objs.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 {font_id} 0 R >> >>"
+            f" /Contents {4 + 2 * i} 0 R >>".encode()
+        )
+        objs.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objs.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    return bytes(out)
+
+
+def check_pdf_concurrent() -> None:
+    pdf = _minimal_pdf([CONTRACT_HEAD] + ["Cláusulas generales.\n" * 30] * 20)
+    expected = list(iter_pdf_pages(io.BytesIO(pdf)))
+    assert len(expected) == 21 and "Santos Dumont" in expected[0], expected[:1]
+
+    def read(_: int) -> None:
+        # como el upload: un stream por request
+        for _ in range(PDF_ROUNDS):
+            assert list(iter_pdf_pages(io.BytesIO(pdf))) == expected
+
+    with ThreadPoolExecutor(PDF_THREADS) as ex:
+        list(ex.map(read, range(PDF_THREADS)))
+    print(f"pdf concurrente ({PDF_THREADS} hilos): ok")
+
+
+def check_pdf_malformed() -> None:
+    # un .pdf roto no puede tirar un 500: se devuelven los campos vacíos
+    pdf = _minimal_pdf([CONTRACT_HEAD])
+    cases = [
+        ("vacío", b""),
+        ("no es PDF", b"hola, esto no es un PDF"),
+        ("solo encabezado", pdf[:40]),
+        ("truncado", pdf[: len(pdf) // 2]),
+    ]
+    # los dos backends (IA_PDF_BACKEND=pdfium|pypdf)
+    for read_pages in (_iter_pdf_pages_pdfium, _iter_pdf_pages_pypdf):
+        for name, data in cases:
+            _, extracted = extract_fields_incremental(read_pages(io.BytesIO(data)))
+            assert extracted["amount"] is None, (read_pages.__name__, name, extracted)
+    print("pdf dañado: ok")
+
+
+
+def _zip(parts: dict) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data in parts.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def check_docx_malformed() -> None:
+    # un .docx roto tampoco: texto vacío, no un 500
+    content_types = (
+        '<?xml version="1.0"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/></Types>'
+    )
+    rels = (
+        '<?xml version="1.0"?><Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="word/document.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/></Relationships>'
+    )
+    cases = [
+        ("vacío", b""),
+        ("no es zip", b"hola, esto no es un DOCX"),
+        ("zip sin partes", _zip({"a.txt": "hola"})),
+        ("sin document.xml", _zip({"[Content_Types].xml": content_types, "_rels/.rels": rels})),
+        ("no es Word", _zip({"[Content_Types].xml": content_types, "_rels/.rels": rels, "word/document.xml": "<x/>"})),
+        ("xml roto", _zip({"[Content_Types].xml": content_types + "<", "_rels/.rels": rels})),
+    ]
+    for name, data in cases:
+        assert extract_text_from_docx(io.BytesIO(data)) == "", name
+    print("docx dañado: ok")
+
+
+if __name__ == "__main__":
+    check_amount_label_dense()
+    check_amount_nested_labels()
+    check_accented_boundaries()
+    check_adjustment_after_core_fields_pdf()
+    check_adjustment_after_head_docx()
+    check_fallback_then_primary_pdf()
+    check_fallback_then_primary_docx()
+    check_pdf_concurrent()
+    check_pdf_malformed()
+    check_docx_malformed()
+    print("OK")
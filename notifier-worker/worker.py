@@ -1,4 +1,5 @@
 import os
+from html import escape
 from datetime import date, timedelta
 from apscheduler.schedulers.blocking import BlockingScheduler
 from sendgrid import SendGridAPIClient
@@ -13,9 +14,10 @@ DAYS_BEFORE = int(os.getenv("DAYS_BEFORE", "60"))
 TZ = os.getenv("TZ", "UTC")
 
 
-def _parse_iso(d: str) -> date:
-    y, m, dd = d.split("-")
-    return date(int(y), int(m), int(dd))
+def _cell(c: dict, key: str) -> str:
+    # los nombres y direcciones vienen de contratos subidos por usuarios: escapar para el HTML del mail
+    v = c.get(key)
+    return escape(str(v)) if v is not None else ""
 
 
 def send_email(subject: str, html: str):
@@ -36,43 +38,44 @@ def send_email(subject: str, html: str):
     sg.send(message)
 
 
+def fetch_contracts_ending_on(end_date: date) -> list:
+    # el backend filtra por end_date (índice); /contracts está paginado por keyset:
+    # seguir nextBeforeId hasta el final
+    contracts = []
+    params = {"limit": 200, "end_date": end_date.isoformat()}
+    with requests.Session() as session:
+        while True:
+            r = session.get(f"{BACKEND_URL}/contracts", params=params, timeout=30)
+            r.raise_for_status()
+            page = r.json()
+            contracts.extend(page["items"])
+            if page.get("nextBeforeId") is None:
+                return contracts
+            params["before_id"] = page["nextBeforeId"]
+
+
 def check_expirations():
     target = date.today() + timedelta(days=DAYS_BEFORE)
 
     try:
-        r = requests.get(f"{BACKEND_URL}/contracts", timeout=30)
-        r.raise_for_status()
-        contracts = r.json()
+        matches = fetch_contracts_ending_on(target)
     except Exception as e:
         print("ERROR fetching contracts:", str(e))
         return
 
-    matches = []
-    for c in contracts:
-        end_date = c.get("endDate")
-        if not end_date:
-            continue
-        try:
-            if _parse_iso(end_date) == target:
-                matches.append(c)
-        except Exception:
-            continue
-
     if not matches:
         print(f"[OK] No expirations for {target.isoformat()}")
         return
 
-    rows = ""
-    for c in matches:
-        rows += f"""
+    rows = "".join(f"""
         <tr>
-          <td style="padding:8px;border-bottom:1px solid #eee">{c.get("id","")}</td>
-          <td style="padding:8px;border-bottom:1px solid #eee">{c.get("propertyLabel","")}</td>
-          <td style="padding:8px;border-bottom:1px solid #eee">{c.get("ownerName","")}</td>
-          <td style="padding:8px;border-bottom:1px solid #eee">{c.get("tenantName","")}</td>
-          <td style="padding:8px;border-bottom:1px solid #eee">{c.get("endDate","")}</td>
+          <td style="padding:8px;border-bottom:1px solid #eee">{_cell(c, "id")}</td>
+          <td style="padding:8px;border-bottom:1px solid #eee">{_cell(c, "propertyLabel")}</td>
+          <td style="padding:8px;border-bottom:1px solid #eee">{_cell(c, "ownerName")}</td>
+          <td style="padding:8px;border-bottom:1px solid #eee">{_cell(c, "tenantName")}</td>
+          <td style="padding:8px;border-bottom:1px solid #eee">{_cell(c, "endDate")}</td>
         </tr>
-        """
+        """ for c in matches)
 
     subject = f"[PropTech Contracts] Vencimientos en {DAYS_BEFORE} días ({target.isoformat()})"
     html = f"""